@@ -1,9 +1,14 @@
 import streamlit as st
-import google.generativeai as genai
-from supabase import create_client, Client
-import json
-from datetime import datetime, timedelta
+import pandas as pd
+import numpy as np
+from pydantic import BaseModel, TypeAdapter, conlist
+from datetime import datetime, timedelta, timezone
 import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # --- CONFIGURATION ---
 try:
@@ -17,83 +22,507 @@ except KeyError as e:
     st.error(f"❌ Missing Secret: {e}. Check your spelling.")
     st.stop()
 
-# Initialize
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-genai.configure(api_key=GEMINI_API_KEY)
+# Initialize (clients are built once per process, not on every rerun)
+@st.cache_resource
+def get_supabase():
+    """Creates the shared Supabase client"""
+    # SDK imports are deferred until first use so the page paints sooner
+    import httpx
+    from supabase import create_client, ClientOptions
+    options = ClientOptions(postgrest_client_timeout=10, storage_client_timeout=10)
+    client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+    # httpx drops idle connections after 5s by default, so most clicks paid a new
+    # TLS handshake; rebuild PostgREST's session with longer-lived keep-alive.
+    # follow_redirects/http2 match the session postgrest-py builds; verify and
+    # proxy stay at httpx's defaults, as ClientOptions doesn't set them here.
+    session = client.postgrest.session
+    client.postgrest.session = type(session)(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        follow_redirects=True,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=300),
+    )
+    session.close()
+    return client
 
-# --- HELPER FUNCTIONS ---
-
-def get_ai_meanings(word):
-    """Fetches AI-generated definitions"""
-    model = genai.GenerativeModel('gemini-flash-latest')
-    
-    prompt = f"""
-    You are a dictionary API. Define '{word}'.
-    You must return VALID JSON only. No markdown, no backticks.
-    Format:
-    {{
+# Fixed dictionary prompt, sent as the system instruction so only the word varies
+DICTIONARY_INSTRUCTIONS = """
+You are a dictionary API. Define each word you are given.
+Return a JSON array with one object per word, in the order given:
+[
+    {
         "meanings": ["Formal definition", "Simple definition", "Creative definition"],
         "examples": "Two example sentences using this word."
-    }}
+    }
+]
+"""
+
+# Structured output: Gemini returns JSON matching this schema directly
+DEFINITION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "meanings": {"type": "ARRAY", "items": {"type": "STRING"}, "min_items": 3, "max_items": 3},
+        "examples": {"type": "STRING"},
+    },
+    "required": ["meanings", "examples"],
+}
+DEFINITIONS_SCHEMA = {"type": "ARRAY", "items": DEFINITION_SCHEMA}
+
+# Output budget per word; scaled by the number of words in a request
+DEFINITION_MAX_TOKENS = 256
+
+class WordDefs(BaseModel):
+    """One word's definitions as returned by Gemini"""
+    meanings: conlist(str, min_length=3, max_length=3)
+    examples: str
+
+@st.cache_resource
+def get_definitions_adapter():
+    """Builds the validator for a Gemini response once per process"""
+    return TypeAdapter(list[WordDefs])
+
+@st.cache_resource
+def configure_gemini():
+    """Sets the Gemini API key once per process"""
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+
+@st.cache_resource
+def get_gemini_model():
+    """Creates the shared Gemini model"""
+    import google.generativeai as genai
+    configure_gemini()
+    return genai.GenerativeModel(
+        'gemini-flash-latest',
+        system_instruction=DICTIONARY_INSTRUCTIONS,
+        generation_config=genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=DEFINITIONS_SCHEMA,
+            max_output_tokens=DEFINITION_MAX_TOKENS,
+            temperature=0.3,
+        ),
+    )
+
+# Columns the UI reads from the vocab table
+VOCAB_COLUMNS = ("id", "word", "mastery_score", "next_review", "meanings", "examples", "custom_note")
+
+# Seconds a cached vocab query is reused; writes clear the caches sooner
+VOCAB_CACHE_TTL = 30
+
+# Backoff between database reconnect attempts after a failed load
+DB_RETRY_MIN_SECONDS = 5
+DB_RETRY_MAX_SECONDS = 300
+
+# --- HELPER FUNCTIONS ---
+
+@st.cache_resource
+def get_ai_memory():
+    """Process-wide {word: definitions} cache in front of the ai_cache table"""
+    return {}
+
+# Gemini quota guard: at most this many requests per rolling minute
+GEMINI_REQUESTS_PER_MINUTE = 20
+
+@st.cache_resource
+def get_gemini_limiter():
+    """Creates the process-wide log of recent Gemini request times"""
+    return {"calls": deque(), "lock": threading.Lock()}
+
+def reserve_gemini_call():
+    """Records a Gemini request, or returns the seconds to wait if over the limit"""
+    limiter = get_gemini_limiter()
+    now = time.monotonic()
+    with limiter['lock']:
+        calls = limiter['calls']
+        while calls and now - calls[0] >= 60:
+            calls.popleft()
+        if len(calls) >= GEMINI_REQUESTS_PER_MINUTE:
+            return 60 - (now - calls[0])
+        calls.append(now)
+        return 0
+
+def generate_meanings(words, preview=None):
+    """Asks Gemini to define several words in a single request, streaming into `preview`"""
+    model = get_gemini_model()
+    prompt = "Define these words:\n" + "\n".join(f"{i}. {w}" for i, w in enumerate(words, 1))
+    response = model.generate_content(
+        prompt, generation_config={"max_output_tokens": DEFINITION_MAX_TOKENS * len(words)}, stream=True)
+    text = ""
+    for chunk in response:
+        text += chunk.text
+        if preview is not None:
+            preview.code(text, language="json")
+    # Parses and validates in one pass, so a malformed reply fails here rather than on save
+    results = get_definitions_adapter().validate_json(text)
+    if len(results) != len(words):
+        raise ValueError(f"expected {len(words)} definitions, got {len(results)}")
+    return [r.model_dump() for r in results]
+
+# Near-duplicate lookups reuse a cached definition for an inflection of the same
+# word ("run" -> "running"). Candidates come from a stem match against the cached
+# words; only those are embedded, to confirm the meaning is nearly identical.
+EMBEDDING_MODEL = 'models/text-embedding-004'
+NEAR_DUPLICATE_SIMILARITY = 0.95
+
+def word_pattern(word):
+    """Regex matching `word` as a whole word (use with re.IGNORECASE)"""
+    return rf"(?<!\w){re.escape(word)}(?!\w)"
+
+def word_stem(word):
+    """Strips common English inflections so run/runs/running compare equal"""
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 3 and word[-1] == word[-2]:
+        word = word[:-1]
+    return word
+
+def embed_words(words):
+    """Returns unit-length embeddings, one row per word"""
+    import google.generativeai as genai
+    configure_gemini()
+    result = genai.embed_content(model=EMBEDDING_MODEL, content=words)
+    vectors = np.array(result['embedding'], dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+# Rows per request when loading the stem index (PostgREST caps unpaged selects)
+STEM_INDEX_PAGE_SIZE = 1000
+
+@st.cache_resource
+def get_stem_index():
+    """Loads the words in ai_cache into a process-wide {stem: word} map"""
+    stems = {}
+    offset = 0
+    while True:
+        page = (get_supabase().table('ai_cache').select("word").order('word')
+                .range(offset, offset + STEM_INDEX_PAGE_SIZE - 1).execute().data)
+        if not page:
+            break
+        for row in page:
+            stems.setdefault(word_stem(row['word']), row['word'])
+        offset += len(page)
+    return {"stems": stems, "lock": threading.Lock()}
+
+def find_near_duplicates(words):
+    """Maps words to a cached word with the same stem and a near-identical embedding
+
+    Only a shortcut around Gemini, so any failure just means no matches.
     """
     try:
-        response = model.generate_content(prompt)
-        text = response.text.replace("```json", "").replace("```", "").strip()
-        return json.loads(text)
+        index = get_stem_index()
+        with index['lock']:
+            pairs = {w: index['stems'][word_stem(w)] for w in words if word_stem(w) in index['stems']}
+        if not pairs:
+            return {}
+        # One embedding call for both sides; rows are unit length, so a dot product is the cosine
+        vectors = embed_words(list(pairs) + list(pairs.values()))
+        scores = (vectors[:len(pairs)] * vectors[len(pairs):]).sum(axis=1)
+        return {w: src for (w, src), score in zip(pairs.items(), scores) if score >= NEAR_DUPLICATE_SIMILARITY}
+    except Exception:
+        return {}
+
+def add_to_stem_index(words):
+    """Adds newly cached words to the stem index (skipped if it can't be loaded)"""
+    try:
+        index = get_stem_index()
+    except Exception:
+        return
+    with index['lock']:
+        for w in words:
+            index['stems'].setdefault(word_stem(w), w)
+
+def get_ai_meanings_batch(words, preview=None):
+    """Fetches AI-generated definitions for several words, one Gemini call for all misses"""
+    keys = [w.strip().lower() for w in words]
+    memory = get_ai_memory()
+    try:
+        misses = list(dict.fromkeys(k for k in keys if k not in memory))
+        if misses:
+            cached = get_supabase().table('ai_cache').select("word,data").in_("word", misses).execute()
+            memory.update((row['word'], row['data']) for row in cached.data)
+            misses = [k for k in misses if k not in memory]
+        if misses:
+            near = find_near_duplicates(misses)
+            sources = [src for src in near.values() if src not in memory]
+            if sources:
+                cached = get_supabase().table('ai_cache').select("word,data").in_("word", sources).execute()
+                memory.update((row['word'], row['data']) for row in cached.data)
+            for k, src in near.items():
+                # Only reuse examples that contain this exact form, so Fill in the Blank still works
+                if src in memory and re.search(word_pattern(k), memory[src]['examples'], re.IGNORECASE):
+                    memory[k] = memory[src]
+            misses = [k for k in misses if k not in memory]
+        if misses:
+            wait = reserve_gemini_call()
+            if wait:
+                st.warning(f"⏳ Rate limit reached, try again in {wait:.0f}s")
+                return None
+            results = generate_meanings(misses, preview)
+            get_supabase().table('ai_cache').upsert([
+                {"word": k, "data": data} for k, data in zip(misses, results)
+            ]).execute()
+            add_to_stem_index(misses)
+            memory.update(zip(misses, results))
+        return [memory[k] for k in keys]
     except Exception as e:
         st.error(f"⚠️ AI Error: {e}")
         return None
 
+def get_ai_meanings(word, preview=None):
+    """Fetches AI-generated definitions"""
+    results = get_ai_meanings_batch([word], preview)
+    return results[0] if results else None
+
 def save_word(word, data, note):
     """Saves word to database"""
+    return save_words([(word, data, note)])
+
+def new_vocab_row(word, data, note, now):
+    """Builds the row for a freshly added word"""
+    return {
+        "word": word,
+        "meanings": data['meanings'],
+        "examples": data['examples'],
+        "custom_note": note,
+        "mastery_score": 0,
+        "next_review": now
+    }
+
+def save_words(entries):
+    """Saves (word, data, note) entries to database in one insert"""
+    now = datetime.now().isoformat()
     try:
-        supabase.table('vocab').insert({
-            "word": word,
-            "meanings": data['meanings'],
-            "examples": data['examples'],
-            "custom_note": note,
-            "mastery_score": 0,
-            "next_review": datetime.now().isoformat()
-        }).execute()
+        get_supabase().table('vocab').insert([
+            new_vocab_row(word, data, note, now) for word, data, note in entries
+        ]).execute()
+        clear_vocab_caches()
         return True
     except Exception as e:
         st.error(f"❌ Database Error: {e}")
         return False
 
-def update_mastery(word_id, current_score, remembered):
-    """Updates spaced repetition score"""
-    if remembered:
-        new_score = min(current_score + 1, 5)
-        days = [0, 1, 3, 7, 14, 30][new_score]
-    else:
-        new_score = 0 
-        days = 0 
+# Analyzed words are inserted in the background as drafts while the user
+# reads the definitions, so Save only has to flip the flag and write the
+# note. Drafts are hidden from every read until saved. The workers run off
+# the script thread, so they get the client passed in and make no st.* calls.
+@st.cache_resource
+def get_db_executor():
+    """Shared worker pool for background database writes"""
+    return ThreadPoolExecutor(max_workers=4)
+
+# Drafts left this long were abandoned (closed tab, expired session)
+DRAFT_EXPIRY = timedelta(days=1)
+
+def insert_draft(client, word, data):
+    """Inserts an analyzed word as a draft and returns its id"""
+    row = new_vocab_row(word, data, "", datetime.now().isoformat())
+    response = client.table('vocab').insert({**row, "draft": True}).execute()
+    # Piggyback the cleanup of abandoned drafts on this background write
+    cutoff = (datetime.now(timezone.utc) - DRAFT_EXPIRY).isoformat()
+    client.table('vocab').delete().eq("draft", True).lt("updated_at", cutoff).execute()
+    return response.data[0]['id']
+
+def start_draft(word, data):
+    """Starts the background insert for an analyzed word"""
+    return get_db_executor().submit(insert_draft, get_supabase(), word, data)
+
+def save_draft(draft, word, data, note):
+    """Turns a drafted word into a saved one, adding the note"""
+    try:
+        word_id = draft.result()
+    except Exception:
+        # The background insert failed; save the word the normal way
+        return save_word(word, data, note)
+    try:
+        get_supabase().table('vocab').update({"draft": False, "custom_note": note}).eq("id", word_id).execute()
+        clear_vocab_caches()
+        return True
+    except Exception as e:
+        st.error(f"❌ Database Error: {e}")
+        return False
+
+def discard_draft(draft):
+    """Deletes a drafted word once its insert has finished"""
+    client = get_supabase()
+    def delete():
+        # Guarded on the flag so a saved word is never removed
+        client.table('vocab').delete().eq("id", draft.result()).eq("draft", True).execute()
+    get_db_executor().submit(delete)
+    # Drafts never reach the store or the review page, but drop anything keyed
+    # by the id anyway so nothing can write the row back
+    if draft.done() and draft.exception() is None:
+        st.session_state.get('pending_mastery', {}).pop(draft.result(), None)
+        forget_word(draft.result())
+
+# Mastery answers are buffered and written in one upsert every few cards
+MASTERY_FLUSH_SIZE = 5
+
+# Days until the next review, indexed by mastery score (0-5)
+SRS_INTERVALS = (0, 1, 3, 7, 14, 30)
+
+def update_mastery(word, remembered):
+    """Queues a spaced repetition score update"""
+    pending = st.session_state.setdefault('pending_mastery', {})
+    # Games rerun only their fragment, so `word` can predate an earlier flush;
+    # the store row carries the last written score
+    current = pending.get(word['id']) or get_vocab_store()['rows'].get(word['id'], word)
+    current_score = current['mastery_score']
+    new_score = min(current_score + 1, 5) if remembered else 0
+    days = SRS_INTERVALS[new_score]
     
     next_date = datetime.now() + timedelta(days=days)
     
+    # Queue the full row so the upsert's insert half satisfies NOT NULL columns
+    pending[word['id']] = {
+        **{col: word[col] for col in VOCAB_COLUMNS},
+        "mastery_score": new_score,
+        "next_review": next_date.isoformat()
+    }
+    if len(pending) >= MASTERY_FLUSH_SIZE:
+        return flush_mastery()
+    return True
+
+def flush_mastery():
+    """Writes queued mastery updates in a single upsert"""
+    pending = st.session_state.get('pending_mastery')
+    if not pending:
+        return True
     try:
-        supabase.table('vocab').update({
-            "mastery_score": new_score,
-            "next_review": next_date.isoformat()
-        }).eq("id", word_id).execute()
+        get_supabase().table('vocab').upsert(list(pending.values()), on_conflict='id').execute()
+        record_mastery(pending.values())
+        pending.clear()
+        clear_vocab_caches()
         return True
     except Exception as e:
         st.error(f"Update failed: {e}")
         return False
 
+def record_mastery(rows):
+    """Applies written mastery updates to the vocab store until the next sync"""
+    store = get_vocab_store()
+    with store['lock']:
+        for row in rows:
+            cached = store['rows'].get(row['id'])
+            if cached is not None:
+                cached.update(
+                    mastery_score=row['mastery_score'],
+                    next_review=row['next_review'],
+                    _next_review_dt=parse_review_date(row['next_review']),
+                )
+
+def parse_review_date(value):
+    """Parses a next_review timestamp into a naive datetime (None if invalid)"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+
+# Shared copy of the vocab table, kept fresh by fetching only changed rows.
+# Deletes made through the app are applied locally; deletes made elsewhere
+# show up after a restart.
+VOCAB_SYNC_SECONDS = 60
+
+@st.cache_resource
+def get_vocab_store():
+    """Creates the process-wide vocab store"""
+    return {"rows": {}, "words": [], "last_sync": None, "synced_at": 0.0, "lock": threading.Lock()}
+
 def get_all_words():
-    """Fetch all words from database"""
+    """Returns all words sorted by word, syncing changed rows at most every 60s"""
+    store = get_vocab_store()
+    with store['lock']:
+        if time.monotonic() - store['synced_at'] >= VOCAB_SYNC_SECONDS:
+            query = (get_supabase().table('vocab').select(",".join(VOCAB_COLUMNS + ("updated_at",)))
+                     .eq('draft', False))
+            if store['last_sync']:
+                # gte re-reads rows stamped at the boundary; merging by id dedupes them
+                query = query.gte('updated_at', store['last_sync'])
+            changed = query.order('updated_at').execute().data
+            if changed:
+                for w in changed:
+                    # Parse review dates once per fetch instead of on every render
+                    w['_next_review_dt'] = parse_review_date(w['next_review'])
+                    store['rows'][w['id']] = w
+                store['last_sync'] = changed[-1]['updated_at']
+                # Sorted here so the collection (and every bucket) is already in order
+                store['words'] = sorted(store['rows'].values(), key=lambda w: w['word'])
+            store['synced_at'] = time.monotonic()
+        return store['words']
+
+def forget_word(word_id):
+    """Removes a deleted word from the vocab store without refetching"""
+    store = get_vocab_store()
+    with store['lock']:
+        if store['rows'].pop(word_id, None) is not None:
+            store['words'] = [w for w in store['words'] if w['id'] != word_id]
+
+# Due words are reviewed a page at a time, oldest first
+REVIEW_PAGE_SIZE = 20
+
+@st.cache_data(ttl=VOCAB_CACHE_TTL, show_spinner=False)
+def fetch_vocab_page(after=None, page_size=REVIEW_PAGE_SIZE):
+    """Fetch dashboard counts and a page of due words in one call (cached, see schema.sql)"""
+    # Keyset paging on (next_review, id): a batch of saved words shares one
+    # next_review, so the id breaks ties at page boundaries
+    after_review, after_id = after or (None, None)
+    # next_review is stored as local time, so "due" is judged by this clock, not the server's
+    response = get_supabase().rpc('vocab_page', {
+        "p_now": datetime.now().isoformat(),
+        "p_after": after_review, "p_after_id": after_id, "p_limit": page_size
+    }).execute()
+    return response.data
+
+def page_cursor(rows):
+    """Cursor for the page that follows `rows`"""
+    return (rows[-1]['next_review'], rows[-1]['id'])
+
+def get_due_words(after=None):
+    """Fetch a page of due words, reporting errors instead of caching them (None on error)"""
     try:
-        response = supabase.table('vocab').select("*").execute()
-        return response.data
+        return fetch_vocab_page(after)['rows']
     except Exception as e:
         st.error(f"Fetch Error: {e}")
-        return []
+        return None
+
+def review_status(next_review, now):
+    """Short label for when a word is next due"""
+    if next_review is None:
+        return "📅 Scheduled"
+    if next_review <= now:
+        return "⏰ Due now"
+    return f"📅 In {(next_review - now).days}d"
+
+def pick_distractors(words, exclude_id, k=3):
+    """Picks k random words other than exclude_id by rejection sampling"""
+    n = len(words)
+    picked = []
+    seen = {exclude_id}
+    while len(picked) < k and len(seen) < n:
+        w = words[random.randrange(n)]
+        if w['id'] in seen:
+            continue
+        seen.add(w['id'])
+        picked.append(w)
+    return picked
+
+def clear_vocab_caches():
+    """Refresh vocab reads on the next rerun after a write"""
+    get_vocab_store()['synced_at'] = 0.0
+    fetch_vocab_page.clear()
 
 def delete_word(word_id):
     """Delete a word from database"""
     try:
-        supabase.table('vocab').delete().eq("id", word_id).execute()
+        get_supabase().table('vocab').delete().eq("id", word_id).execute()
+        st.session_state.get('pending_mastery', {}).pop(word_id, None)
+        forget_word(word_id)
+        fetch_vocab_page.clear()
+        # Refetch the review page so the deleted word can't be answered (and re-upserted)
+        st.session_state.pop('review_rows', None)
+        st.session_state['review_index'] = 0
         return True
     except Exception as e:
         st.error(f"Delete Error: {e}")
@@ -159,31 +588,64 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Badge HTML for each mastery level (0-5)
+MASTERY_BADGES = tuple(f"<span class='mastery-badge mastery-{i}'>Level {i}</span>" for i in range(6))
+
 # --- HEADER ---
 st.markdown("<h1 style='text-align: center; color: white; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);'>🎮 Vocab Master</h1>", unsafe_allow_html=True)
 st.markdown("<p style='text-align: center; color: white; font-size: 1.2rem;'>Level up your vocabulary with AI-powered learning</p>", unsafe_allow_html=True)
 
-# Database connection check
+# Load words; a failed fetch doubles as the database connection check.
+# After a failure, back off exponentially instead of retrying on every rerun.
+retry_at = st.session_state.get('db_retry_at', 0.0)
+if time.time() < retry_at:
+    st.error(f"⚠️ Cannot connect to Database. Retrying in {retry_at - time.time():.0f}s")
+    st.stop()
 try:
-    supabase.table('vocab').select("count", count='exact').execute()
+    words = get_all_words()
+    st.session_state.pop('db_retry_delay', None)
 except Exception as e:
+    delay = min(st.session_state.get('db_retry_delay', DB_RETRY_MIN_SECONDS / 2) * 2, DB_RETRY_MAX_SECONDS)
+    st.session_state['db_retry_delay'] = delay
+    st.session_state['db_retry_at'] = time.time() + delay
     st.error(f"⚠️ Cannot connect to Database: {e}")
     st.stop()
 
 # --- STATS DASHBOARD ---
-words = get_all_words()
+
+# Group words by mastery level in a single pass
+mastery_buckets = {"New (0)": [], "Learning (1-3)": [], "Mastered (4-5)": []}
+for w in words:
+    score = w['mastery_score']
+    if score == 0:
+        mastery_buckets["New (0)"].append(w)
+    elif score >= 4:
+        mastery_buckets["Mastered (4-5)"].append(w)
+    else:
+        mastery_buckets["Learning (1-3)"].append(w)
+
+try:
+    # Same cached call as the Review tab's first page (cache keys only cover passed args)
+    stats = fetch_vocab_page(None)['stats']
+except Exception as e:
+    st.error(f"Stats Error: {e}")
+    stats = {
+        "total": len(words),
+        "mastered": len(mastery_buckets["Mastered (4-5)"]),
+        "learning": len(mastery_buckets["Learning (1-3)"]),
+        "new_count": len(mastery_buckets["New (0)"]),
+        "due_now": sum(1 for w in words if w['_next_review_dt'] and w['_next_review_dt'] <= datetime.now()),
+    }
+
 col1, col2, col3, col4 = st.columns(4)
 with col1:
-    st.metric("📚 Total Words", len(words))
+    st.metric("📚 Total Words", stats['total'])
 with col2:
-    mastered = len([w for w in words if w['mastery_score'] >= 4])
-    st.metric("🏆 Mastered", mastered)
+    st.metric("🏆 Mastered", stats['mastered'])
 with col3:
-    learning = len([w for w in words if 0 < w['mastery_score'] < 4])
-    st.metric("📖 Learning", learning)
+    st.metric("📖 Learning", stats['learning'])
 with col4:
-    new = len([w for w in words if w['mastery_score'] == 0])
-    st.metric("🆕 New", new)
+    st.metric("🆕 New", stats['new_count'])
 
 st.markdown("---")
 
@@ -191,7 +653,8 @@ st.markdown("---")
 tab1, tab2, tab3, tab4 = st.tabs(["➕ Add Word", "🎮 Play Games", "📚 Review & Study", "📊 My Collection"])
 
 # TAB 1: ADD WORD
-with tab1:
+@st.fragment
+def add_word_tab():
     st.markdown("<div class='word-card'>", unsafe_allow_html=True)
     st.subheader("Add a New Word")
     
@@ -202,11 +665,16 @@ with tab1:
         analyze_btn = st.button("🔍 Analyze", use_container_width=True, type="primary")
     
     if analyze_btn and new_word:
+        preview = st.empty()
         with st.spinner("🤖 AI is thinking..."):
-            result = get_ai_meanings(new_word)
+            result = get_ai_meanings(new_word, preview)
+            preview.empty()
             if result:
+                if 'draft' in st.session_state:
+                    discard_draft(st.session_state.pop('draft'))
                 st.session_state['temp_data'] = result
                 st.session_state['current_word'] = new_word
+                st.session_state['draft'] = start_draft(new_word, result)
                 st.success("✅ Analysis complete!")
     
     if 'temp_data' in st.session_state:
@@ -219,27 +687,64 @@ with tab1:
         st.markdown("### 💬 Example Usage")
         st.success(data['examples'])
         
-        note = st.text_area("Add your personal note (optional):", placeholder="Your own thoughts, memory tricks, etc.")
+        # A form so typing the note doesn't rerun (and resend) the panel above
+        with st.form("save_word_form", border=False):
+            note = st.text_area("Add your personal note (optional):", placeholder="Your own thoughts, memory tricks, etc.")
+            
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                save_clicked = st.form_submit_button("💾 Save to Collection", use_container_width=True, type="primary")
+            with col2:
+                discard_clicked = st.form_submit_button("🔄 Try Another Word", use_container_width=True)
         
-        col1, col2 = st.columns([1, 1])
-        with col1:
-            if st.button("💾 Save to Collection", use_container_width=True, type="primary"):
-                if save_word(st.session_state['current_word'], data, note):
-                    st.balloons()
-                    st.success(f"🎉 '{st.session_state['current_word']}' added to your collection!")
-                    del st.session_state['temp_data']
-                    del st.session_state['current_word']
-                    st.rerun()
-        with col2:
-            if st.button("🔄 Try Another Word", use_container_width=True):
+        if save_clicked:
+            word = st.session_state['current_word']
+            if 'draft' in st.session_state:
+                saved = save_draft(st.session_state['draft'], word, data, note)
+            else:
+                saved = save_word(word, data, note)
+            if saved:
+                st.balloons()
+                st.success(f"🎉 '{word}' added to your collection!")
                 del st.session_state['temp_data']
                 del st.session_state['current_word']
+                st.session_state.pop('draft', None)
                 st.rerun()
+        elif discard_clicked:
+            if 'draft' in st.session_state:
+                discard_draft(st.session_state.pop('draft'))
+            del st.session_state['temp_data']
+            del st.session_state['current_word']
+            st.rerun()
+    
+    with st.expander("📋 Add several words at once"):
+        batch_text = st.text_area("Enter words, one per line:", placeholder="serendipity\nephemeral\nubiquitous")
+        if st.button("🔍 Analyze All", use_container_width=True) and batch_text.strip():
+            batch_words = list(dict.fromkeys(w.strip() for w in batch_text.splitlines() if w.strip()))
+            preview = st.empty()
+            with st.spinner("🤖 AI is thinking..."):
+                results = get_ai_meanings_batch(batch_words, preview)
+                preview.empty()
+                if results:
+                    st.session_state['batch_data'] = list(zip(batch_words, results))
+        
+        if 'batch_data' in st.session_state:
+            for batch_word, data in st.session_state['batch_data']:
+                st.info(f"**{batch_word}** - {data['meanings'][1]}")
+            if st.button("💾 Save All", use_container_width=True, type="primary"):
+                if save_words([(w, d, "") for w, d in st.session_state['batch_data']]):
+                    st.balloons()
+                    del st.session_state['batch_data']
+                    st.rerun()
     
     st.markdown("</div>", unsafe_allow_html=True)
 
+with tab1:
+    add_word_tab()
+
 # TAB 2: GAMES
-with tab2:
+@st.fragment
+def games_tab():
     if len(words) < 4:
         st.warning("⚠️ You need at least 4 words to play games. Add more words first!")
     else:
@@ -269,13 +774,12 @@ with tab2:
                 st.session_state['current_question'] = random.choice(words)
                 
                 # Generate wrong options
-                other_words = [w for w in words if w['id'] != st.session_state['current_question']['id']]
-                wrong_options = random.sample(other_words, min(3, len(other_words)))
+                wrong_options = pick_distractors(words, st.session_state['current_question']['id'])
                 
                 options = [st.session_state['current_question']] + wrong_options
                 random.shuffle(options)
                 st.session_state['options'] = options
-                st.rerun()
+                st.rerun(scope="fragment")
             
             if st.session_state['game_active']:
                 question = st.session_state['current_question']
@@ -291,10 +795,10 @@ with tab2:
                         if opt['id'] == question['id']:
                             st.session_state['game_score'] += 1
                             st.success("✅ Correct!")
-                            update_mastery(question['id'], question['mastery_score'], True)
+                            update_mastery(question, True)
                         else:
                             st.error(f"❌ Wrong! The correct answer was: {question['meanings'][0]}")
-                            update_mastery(question['id'], question['mastery_score'], False)
+                            update_mastery(question, False)
                         
                         st.info(f"Score: {st.session_state['game_score']}/{st.session_state['game_questions']}")
                         
@@ -302,13 +806,13 @@ with tab2:
                             if st.button("Next Question ➡️"):
                                 # Load next question
                                 st.session_state['current_question'] = random.choice(words)
-                                other_words = [w for w in words if w['id'] != st.session_state['current_question']['id']]
-                                wrong_options = random.sample(other_words, min(3, len(other_words)))
+                                wrong_options = pick_distractors(words, st.session_state['current_question']['id'])
                                 options = [st.session_state['current_question']] + wrong_options
                                 random.shuffle(options)
                                 st.session_state['options'] = options
-                                st.rerun()
+                                st.rerun(scope="fragment")
                         else:
+                            flush_mastery()
                             st.balloons()
                             percentage = (st.session_state['game_score'] / st.session_state['game_questions']) * 100
                             st.success(f"🎉 Game Over! Your score: {st.session_state['game_score']}/{st.session_state['game_questions']} ({percentage:.0f}%)")
@@ -328,7 +832,7 @@ with tab2:
                 st.session_state['game_score'] = 0
                 st.session_state['game_questions'] = 0
                 st.session_state['current_question'] = random.choice(words)
-                st.rerun()
+                st.rerun(scope="fragment")
             
             if st.session_state['game_active']:
                 question = st.session_state['current_question']
@@ -338,9 +842,8 @@ with tab2:
                 # Show example with blank
                 example = question['examples']
                 word_to_hide = question['word']
-                hidden_example = example.replace(word_to_hide, "______")
-                hidden_example = hidden_example.replace(word_to_hide.capitalize(), "______")
-                hidden_example = hidden_example.replace(word_to_hide.upper(), "______")
+                # One case-insensitive pass; re caches the compiled pattern across reruns
+                hidden_example = re.sub(word_pattern(word_to_hide), "______", example, flags=re.IGNORECASE)
                 
                 st.markdown(f"### 📝 {hidden_example}")
                 
@@ -351,18 +854,19 @@ with tab2:
                     if user_answer.lower().strip() == word_to_hide.lower():
                         st.session_state['game_score'] += 1
                         st.success(f"✅ Correct! The word is '{word_to_hide}'")
-                        update_mastery(question['id'], question['mastery_score'], True)
+                        update_mastery(question, True)
                     else:
                         st.error(f"❌ Wrong! The correct word is '{word_to_hide}'")
-                        update_mastery(question['id'], question['mastery_score'], False)
+                        update_mastery(question, False)
                     
                     st.info(f"Score: {st.session_state['game_score']}/{st.session_state['game_questions']}")
                     
                     if st.session_state['game_questions'] < 10:
                         if st.button("Next Question ➡️"):
                             st.session_state['current_question'] = random.choice(words)
-                            st.rerun()
+                            st.rerun(scope="fragment")
                     else:
+                        flush_mastery()
                         st.balloons()
                         percentage = (st.session_state['game_score'] / st.session_state['game_questions']) * 100
                         st.success(f"🎉 Game Over! Your score: {st.session_state['game_score']}/{st.session_state['game_questions']} ({percentage:.0f}%)")
@@ -389,13 +893,13 @@ with tab2:
                 if is_correct:
                     shown_definition = question_word['meanings'][0]
                 else:
-                    other_word = random.choice([w for w in words if w['id'] != question_word['id']])
+                    other_word = pick_distractors(words, question_word['id'], k=1)[0]
                     shown_definition = other_word['meanings'][0]
                 
                 st.session_state['current_question'] = question_word
                 st.session_state['shown_definition'] = shown_definition
                 st.session_state['is_correct'] = is_correct
-                st.rerun()
+                st.rerun(scope="fragment")
             
             if st.session_state['game_active']:
                 question = st.session_state['current_question']
@@ -412,10 +916,10 @@ with tab2:
                         if st.session_state['is_correct']:
                             st.session_state['game_score'] += 1
                             st.success("✅ Correct!")
-                            update_mastery(question['id'], question['mastery_score'], True)
+                            update_mastery(question, True)
                         else:
                             st.error(f"❌ Wrong! Correct definition: {question['meanings'][0]}")
-                            update_mastery(question['id'], question['mastery_score'], False)
+                            update_mastery(question, False)
                         
                         st.info(f"Score: {st.session_state['game_score']}/{st.session_state['game_questions']}")
                         
@@ -427,14 +931,15 @@ with tab2:
                                 if is_correct:
                                     shown_definition = question_word['meanings'][0]
                                 else:
-                                    other_word = random.choice([w for w in words if w['id'] != question_word['id']])
+                                    other_word = pick_distractors(words, question_word['id'], k=1)[0]
                                     shown_definition = other_word['meanings'][0]
                                 
                                 st.session_state['current_question'] = question_word
                                 st.session_state['shown_definition'] = shown_definition
                                 st.session_state['is_correct'] = is_correct
-                                st.rerun()
+                                st.rerun(scope="fragment")
                         else:
+                            flush_mastery()
                             st.balloons()
                             percentage = (st.session_state['game_score'] / st.session_state['game_questions']) * 100
                             st.success(f"🎉 Game Over! Your score: {st.session_state['game_score']}/{st.session_state['game_questions']} ({percentage:.0f}%)")
@@ -448,10 +953,10 @@ with tab2:
                         if not st.session_state['is_correct']:
                             st.session_state['game_score'] += 1
                             st.success(f"✅ Correct! Real definition: {question['meanings'][0]}")
-                            update_mastery(question['id'], question['mastery_score'], True)
+                            update_mastery(question, True)
                         else:
                             st.error("❌ Wrong! This was the correct definition")
-                            update_mastery(question['id'], question['mastery_score'], False)
+                            update_mastery(question, False)
                         
                         st.info(f"Score: {st.session_state['game_score']}/{st.session_state['game_questions']}")
                         
@@ -463,14 +968,15 @@ with tab2:
                                 if is_correct:
                                     shown_definition = question_word['meanings'][0]
                                 else:
-                                    other_word = random.choice([w for w in words if w['id'] != question_word['id']])
+                                    other_word = pick_distractors(words, question_word['id'], k=1)[0]
                                     shown_definition = other_word['meanings'][0]
                                 
                                 st.session_state['current_question'] = question_word
                                 st.session_state['shown_definition'] = shown_definition
                                 st.session_state['is_correct'] = is_correct
-                                st.rerun()
+                                st.rerun(scope="fragment")
                         else:
+                            flush_mastery()
                             st.balloons()
                             percentage = (st.session_state['game_score'] / st.session_state['game_questions']) * 100
                             st.success(f"🎉 Game Over! Your score: {st.session_state['game_score']}/{st.session_state['game_questions']} ({percentage:.0f}%)")
@@ -478,26 +984,29 @@ with tab2:
                                 st.session_state['game_active'] = False
                                 st.rerun()
 
+with tab2:
+    games_tab()
+
 # TAB 3: REVIEW & STUDY
-with tab3:
+@st.fragment
+def review_tab():
     st.subheader("📚 Spaced Repetition Review")
     
-    # Handle timezone-aware datetime comparison
-    try:
-        due_words = []
-        for w in words:
-            next_review = datetime.fromisoformat(w['next_review'].replace('Z', '+00:00'))
-            # Remove timezone info for comparison
-            if next_review.replace(tzinfo=None) <= datetime.now():
-                due_words.append(w)
-    except:
-        # Fallback to simple comparison
-        due_words = [w for w in words if w['next_review'] <= datetime.now().isoformat()]
+    # Each entry is the cursor a page starts after; the last one is the current page
+    review_pages = st.session_state.setdefault('review_pages', [None])
+    # The page is kept as fetched until it changes: flushed answers leave the due
+    # set, and refetching mid-page would shift the remaining cards under review_index
+    due_words = st.session_state.get('review_rows')
+    if due_words is None:
+        due_words = get_due_words(review_pages[-1]) or []
+        # Empty pages aren't kept, so words saved later still show up
+        if due_words:
+            st.session_state['review_rows'] = due_words
     
-    if not due_words:
+    if not due_words and len(review_pages) == 1:
         st.success("🎉 No words due for review! Come back later or practice in Games mode.")
     else:
-        st.info(f"📝 {len(due_words)} words are due for review")
+        st.info(f"📝 {stats['due_now']} words are due for review")
         
         if 'review_index' not in st.session_state:
             st.session_state['review_index'] = 0
@@ -519,29 +1028,60 @@ with tab3:
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("✅ Yes, I knew it!", use_container_width=True, type="primary"):
-                    update_mastery(word['id'], word['mastery_score'], True)
+                    update_mastery(word, True)
                     st.session_state['review_index'] += 1
                     st.success("Great job! 🎉")
-                    st.rerun()
+                    st.rerun(scope="fragment")
             with col2:
                 if st.button("❌ No, I forgot", use_container_width=True):
-                    update_mastery(word['id'], word['mastery_score'], False)
+                    update_mastery(word, False)
                     st.session_state['review_index'] += 1
                     st.info("That's okay! You'll see it again soon.")
-                    st.rerun()
+                    st.rerun(scope="fragment")
             
             st.markdown("</div>", unsafe_allow_html=True)
             st.progress((st.session_state['review_index'] + 1) / len(due_words))
-            st.caption(f"Progress: {st.session_state['review_index'] + 1}/{len(due_words)}")
+            st.caption(f"Page {len(review_pages)} · Progress: {st.session_state['review_index'] + 1}/{len(due_words)}")
+        elif len(due_words) == REVIEW_PAGE_SIZE:
+            flush_mastery()
+            st.success("✅ Page complete! More words are waiting on the next page.")
         else:
+            flush_mastery()
             st.balloons()
             st.success("🎉 Review session complete!")
             if st.button("Start New Review"):
                 st.session_state['review_index'] = 0
+                st.session_state['review_pages'] = [None]
+                st.session_state.pop('review_rows', None)
+                st.rerun()
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("⬅️ Previous Page", use_container_width=True, disabled=len(review_pages) == 1):
+                flush_mastery()
+                review_pages.pop()
+                st.session_state['review_index'] = 0
+                st.session_state.pop('review_rows', None)
+                st.rerun()
+        with col2:
+            if st.button("Next Page ➡️", use_container_width=True, disabled=len(due_words) < REVIEW_PAGE_SIZE):
+                flush_mastery()
+                review_pages.append(page_cursor(due_words))
+                st.session_state['review_index'] = 0
+                st.session_state.pop('review_rows', None)
+                st.rerun()
+        
+        pending_count = len(st.session_state.get('pending_mastery', {}))
+        if pending_count and st.button(f"💾 Save Progress ({pending_count})", use_container_width=True):
+            if flush_mastery():
                 st.rerun()
 
+with tab3:
+    review_tab()
+
 # TAB 4: MY COLLECTION
-with tab4:
+@st.fragment
+def collection_tab():
     st.subheader("📊 Your Vocabulary Collection")
     
     if not words:
@@ -551,51 +1091,50 @@ with tab4:
         filter_option = st.selectbox("Filter by mastery level:", 
                                     ["All Words", "New (0)", "Learning (1-3)", "Mastered (4-5)"])
         
-        filtered_words = words
-        if filter_option == "New (0)":
-            filtered_words = [w for w in words if w['mastery_score'] == 0]
-        elif filter_option == "Learning (1-3)":
-            filtered_words = [w for w in words if 1 <= w['mastery_score'] <= 3]
-        elif filter_option == "Mastered (4-5)":
-            filtered_words = [w for w in words if w['mastery_score'] >= 4]
+        filtered_words = mastery_buckets.get(filter_option, words)
         
         st.write(f"Showing {len(filtered_words)} words")
         
-        for word in sorted(filtered_words, key=lambda x: x['word']):
-            with st.expander(f"**{word['word']}** - {word['meanings'][1][:50]}..."):
-                col1, col2 = st.columns([3, 1])
+        now = datetime.now()
+        
+        # One table element for the whole list; details render for the selected row only
+        table = pd.DataFrame({
+            "Word": [w['word'] for w in filtered_words],
+            "Definition": [w['meanings'][1] for w in filtered_words],
+            "Level": [w['mastery_score'] for w in filtered_words],
+            "Next Review": [review_status(w['_next_review_dt'], now) for w in filtered_words],
+        })
+        selection = st.dataframe(table, use_container_width=True, hide_index=True,
+                                 on_select="rerun", selection_mode="single-row")
+        
+        selected = [i for i in selection.selection.rows if i < len(filtered_words)]
+        if not selected:
+            st.caption("Select a word to see its details.")
+        else:
+            word = filtered_words[selected[0]]
+            st.markdown(f"### {word['word']}")
+            col1, col2 = st.columns([3, 1])
+            
+            with col1:
+                st.markdown("**Definitions:**")
+                for i, meaning in enumerate(word['meanings'], 1):
+                    st.write(f"{i}. {meaning}")
                 
-                with col1:
-                    st.markdown("**Definitions:**")
-                    for i, meaning in enumerate(word['meanings'], 1):
-                        st.write(f"{i}. {meaning}")
-                    
-                    st.markdown(f"**Examples:** {word['examples']}")
-                    
-                    if word['custom_note']:
-                        st.info(f"📝 Your note: {word['custom_note']}")
+                st.markdown(f"**Examples:** {word['examples']}")
                 
-                with col2:
-                    mastery = word['mastery_score']
-                    st.markdown(f"<span class='mastery-badge mastery-{mastery}'>Level {mastery}</span>", 
-                              unsafe_allow_html=True)
-                    
-                    try:
-                        next_review = datetime.fromisoformat(word['next_review'].replace('Z', '+00:00'))
-                        next_review = next_review.replace(tzinfo=None)
-                        
-                        if next_review <= datetime.now():
-                            st.warning("⏰ Due now")
-                        else:
-                            days_until = (next_review - datetime.now()).days
-                            st.success(f"📅 Review in {days_until}d")
-                    except:
-                        st.info("📅 Review scheduled")
-                    
-                    if st.button("🗑️ Delete", key=f"del_{word['id']}"):
-                        if delete_word(word['id']):
-                            st.success("Deleted!")
-                            st.rerun()
+                if word['custom_note']:
+                    st.info(f"📝 Your note: {word['custom_note']}")
+            
+            with col2:
+                st.markdown(MASTERY_BADGES[word['mastery_score']], unsafe_allow_html=True)
+                
+                if st.button("🗑️ Delete", key=f"del_{word['id']}"):
+                    if delete_word(word['id']):
+                        st.success("Deleted!")
+                        st.rerun()
+
+with tab4:
+    collection_tab()
 
 st.markdown("---")
 st.markdown("<p style='text-align: center; color: white;'>Made with ❤️ | Keep learning and growing! 🌱</p>", unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,81 @@
+-- Database setup for Vocab Master.
+-- Run in the Supabase SQL editor; every statement is safe to re-run.
+
+-- "Due for review" query: next_review <= p_now, paged by (next_review, id)
+drop index if exists vocab_next_review_idx;
+create index if not exists vocab_next_review_id_idx on vocab (next_review, id);
+
+-- Mastery-level filters: mastery_score = n / >= n
+create index if not exists vocab_mastery_idx on vocab (mastery_score);
+
+-- Analyzed words are inserted as drafts before the user clicks Save; every
+-- read below skips them until Save clears the flag
+alter table vocab add column if not exists draft boolean not null default false;
+
+-- Dashboard counts in one row. next_review is written as the app's local
+-- time, so "due" compares against the app's clock (p_now), not now().
+drop function if exists get_vocab_stats();
+create or replace function get_vocab_stats(p_now timestamptz)
+returns table(total int, mastered int, learning int, new_count int, due_now int)
+language sql stable as $$
+    select count(*)::int,
+           count(*) filter (where mastery_score >= 4)::int,
+           count(*) filter (where mastery_score between 1 and 3)::int,
+           count(*) filter (where mastery_score = 0)::int,
+           count(*) filter (where next_review <= p_now)::int
+    from vocab
+    where not draft
+$$;
+
+-- Incremental sync: the app only fetches rows with updated_at >= its last sync
+alter table vocab add column if not exists updated_at timestamptz not null default now();
+create index if not exists vocab_updated_at_idx on vocab (updated_at);
+
+create or replace function vocab_touch_updated_at()
+returns trigger
+language plpgsql as $$
+begin
+    new.updated_at = now();
+    return new;
+end
+$$;
+
+drop trigger if exists vocab_touch_updated_at on vocab;
+create trigger vocab_touch_updated_at
+    before update on vocab
+    for each row execute function vocab_touch_updated_at();
+
+-- Gemini definitions shared across sessions and restarts, keyed by the
+-- lowercased word
+create table if not exists ai_cache (
+    word text primary key,
+    data jsonb not null,
+    created_at timestamptz not null default now()
+);
+
+-- Dashboard counts plus one page of due words in a single round-trip:
+-- supabase.rpc('vocab_page', {p_now, p_after, p_after_id, p_limit}). p_now is
+-- the app's clock (see get_vocab_stats). The cursor is the (next_review, id)
+-- of the previous page's last row, or nulls for the first page; id breaks
+-- ties between words saved in the same batch.
+drop function if exists vocab_page(timestamptz, int);
+drop function if exists vocab_page(timestamptz, bigint, int);
+create or replace function vocab_page(p_now timestamptz, p_after timestamptz, p_after_id bigint, p_limit int)
+returns json
+language sql stable as $$
+    select json_build_object(
+        'stats', (select row_to_json(s) from get_vocab_stats(p_now) s),
+        'rows', coalesce((
+            select json_agg(t)
+            from (
+                select id, word, mastery_score, next_review, meanings, examples, custom_note
+                from vocab
+                where not draft
+                  and next_review <= p_now
+                  and (p_after is null or (next_review, id) > (p_after, p_after_id))
+                order by next_review, id
+                limit p_limit
+            ) t
+        ), '[]'::json)
+    )
+$$;